@@ -1,14 +1,23 @@
-from io import BytesIO
-from os.path import dirname, join
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, expanduser, join
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
 from zipfile import ZipFile
 
 import requests
 import typer
-from github import Github
-from github.GitReleaseAsset import GitReleaseAsset
 
 from perke.cli.base import app
 
+releases_url = 'https://api.github.com/repos/sobhe/hazm/releases'
+cache_path = join(expanduser('~'), '.cache', 'perke', 'latest.json')
+cache_ttl = 24*60*60
+
 
 @app.command('download')
 def download_command() -> None:
@@ -29,47 +38,297 @@ def download() -> None:
     download_and_extract_asset(asset, extract_path)
 
 
-def get_latest_resources_asset() -> GitReleaseAsset:
+def get_latest_resources_asset() -> Dict[str, Any]:
     """
     Searches through hazm's releases and find latest release that contains
-    resources.
+    resources. The result is cached on disk for a day.
+
+    Returns
+    -------
+    asset: `dict[str, Any]`
+        The resources asset, containing `'name'`, `'size'` and
+        `'browser_download_url'` of the asset as given by the github API
+    """
+    asset = load_cached_asset()
+    if asset is not None:
+        return asset
+
+    # The latest release usually contains the resources
+    r = requests.get(f'{releases_url}/latest')
+    r.raise_for_status()
+    asset = find_resources_asset(r.json())
+
+    # Otherwise search through the recent releases
+    if asset is None:
+        r = requests.get(releases_url, params={'per_page': 30})
+        r.raise_for_status()
+        for release in r.json():
+            asset = find_resources_asset(release)
+            if asset is not None:
+                break
+
+    if asset is not None:
+        save_cached_asset(asset)
+    return asset
+
+
+def find_resources_asset(release: Dict[str, Any],
+                         ) -> Optional[Dict[str, Any]]:
+    """
+    Finds the resources asset of a release.
+
+    Parameters
+    ----------
+    release: `dict[str, Any]`
+        The release as given by the github API
+
+    Returns
+    -------
+    asset: `dict[str, Any]`, optional
+        The resources asset, `None` if the release does not contain
+        resources
+    """
+    for asset in release['assets']:
+        if asset['name'].startswith(f'resources-{release["tag_name"][1:]}'):
+            return {'name': asset['name'],
+                    'size': asset['size'],
+                    'browser_download_url': asset['browser_download_url']}
+    return None
+
+
+def load_cached_asset() -> Optional[Dict[str, Any]]:
+    """
+    Loads the cached resources asset if it is not expired.
 
     Returns
     -------
-    asset: GitReleaseAsset
+    asset: `dict[str, Any]`, optional
+        The cached resources asset, `None` if there is no valid cache
+    """
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if time.time() - cache['time'] < cache_ttl:
+            return cache['asset']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def save_cached_asset(asset: Dict[str, Any]) -> None:
+    """
+    Caches the resources asset on disk, failures are ignored since the
+    cache is only an optimization.
+
+    Parameters
+    ----------
+    asset: `dict[str, Any]`
         The resources asset
     """
-    g = Github()
-    repo = g.get_repo('sobhe/hazm')
-    for release in repo.get_releases():
-        for asset in release.get_assets():
-            if asset.name.startswith(f'resources-{release.tag_name[1:]}'):
-                return asset
+    try:
+        os.makedirs(dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump({'time': time.time(), 'asset': asset}, f)
+    except OSError:
+        pass
 
 
-def download_and_extract_asset(asset: GitReleaseAsset,
+def download_and_extract_asset(asset: Dict[str, Any],
                                extract_path: str,
+                               n_threads: int = 8,
                                ) -> None:
     """
     Downloads a github asset file and extract it.
 
     Parameters
     ----------
-    asset: `GitReleaseAsset`
-        The github asset to be downloaded
+    asset: `dict[str, Any]`
+        The github asset to be downloaded, see
+        `get_latest_resources_asset`
 
     extract_path: `str`
         The extract path for the downloaded file to be extracted
+
+    n_threads: `int`
+        Number of parallel connections used to download the asset if
+        the server supports range requests, defaults to `8`.
     """
-    chunk_size = 1024*1024
-    with typer.progressbar(length=asset.size,
-                           label=f'Downloading {asset.name} ...') as progress:
-        with requests.get(url=asset.browser_download_url,
-                          stream=True) as r:
-            with BytesIO() as io_file:
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    io_file.write(chunk)
-                    progress.update(chunk_size)
-                with ZipFile(io_file) as zip_file:
-                    zip_file.extractall(path=extract_path)
+    temp_file = NamedTemporaryFile(suffix='.zip', delete=False)
+    temp_file.close()
+    try:
+        with requests.Session() as session:
+            with typer.progressbar(length=asset['size'],
+                                   label=f'Downloading {asset["name"]} ...',
+                                   ) as progress:
+                # Resolve redirects and check for range requests support,
+                # fall back to a single connection if the probe fails
+                r = session.head(url=asset['browser_download_url'],
+                                 allow_redirects=True)
+                size = int(r.headers.get('Content-Length', 0))
+                if not r.ok:
+                    download_in_series(session,
+                                       asset['browser_download_url'],
+                                       temp_file.name,
+                                       progress.update)
+                elif r.headers.get('Accept-Ranges') == 'bytes' and size > 0:
+                    download_in_parallel(r.url,
+                                         temp_file.name,
+                                         size,
+                                         progress.update,
+                                         n_threads)
+                else:
+                    download_in_series(session,
+                                       r.url,
+                                       temp_file.name,
+                                       progress.update)
+
+        with ZipFile(temp_file.name) as zip_file:
+            zip_file.extractall(path=extract_path)
+    finally:
+        os.remove(temp_file.name)
     typer.echo('Download completed.')
+
+
+def download_in_series(session: requests.Session,
+                       url: str,
+                       path: str,
+                       update: Callable[[int], None],
+                       chunk_size: int = 4*1024*1024,
+                       ) -> None:
+    """
+    Downloads a file over a single connection and streams it directly
+    to the disk to keep memory usage constant.
+
+    Parameters
+    ----------
+    session: `requests.Session`
+        The session to send the request with
+
+    url: `str`
+        The url of the file
+
+    path: `str`
+        The path of the downloaded file
+
+    update: `(int) -> None`
+        Callback to report number of downloaded bytes
+
+    chunk_size: `int`
+        Size of chunks to be written in bytes, defaults to 4 MiB.
+    """
+    with open(path, 'wb') as f:
+        with session.get(url=url, stream=True) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                update(len(chunk))
+
+
+def download_in_parallel(url: str,
+                         path: str,
+                         size: int,
+                         update: Callable[[int], None],
+                         n_threads: int = 8,
+                         ) -> None:
+    """
+    Downloads a file with parallel range requests, each one writes its
+    own part of a memory mapped file.
+
+    Parameters
+    ----------
+    url: `str`
+        The url of the file, the server must support range requests
+
+    path: `str`
+        The path of the downloaded file
+
+    size: `int`
+        Size of the file in bytes
+
+    update: `(int) -> None`
+        Callback to report number of downloaded bytes
+
+    n_threads: `int`
+        Number of parallel connections, defaults to `8`.
+    """
+    with open(path, 'r+b') as f:
+        # Allocate the whole file before writing the parts
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+
+        with mmap.mmap(f.fileno(), size) as buffer:
+            lock = Lock()
+
+            def synchronized_update(n: int) -> None:
+                with lock:
+                    update(n)
+
+            part_size = -(-size//n_threads)
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                futures = [executor.submit(download_range,
+                                           url,
+                                           start,
+                                           min(start + part_size, size),
+                                           buffer,
+                                           synchronized_update)
+                           for start in range(0, size, part_size)]
+                for future in futures:
+                    future.result()
+            buffer.flush()
+
+
+def download_range(url: str,
+                   start: int,
+                   end: int,
+                   buffer: mmap.mmap,
+                   update: Callable[[int], None],
+                   chunk_size: int = 4*1024*1024,
+                   ) -> None:
+    """
+    Downloads a byte range of a file into the same range of a buffer.
+
+    Parameters
+    ----------
+    url: `str`
+        The url of the file
+
+    start: `int`
+        Start of the range (inclusive)
+
+    end: `int`
+        End of the range (exclusive)
+
+    buffer: `mmap.mmap`
+        The buffer to write the range into
+
+    update: `(int) -> None`
+        Callback to report number of downloaded bytes
+
+    chunk_size: `int`
+        Size of chunks to be written in bytes, defaults to 4 MiB.
+    """
+    # Byte ranges refer to the raw file, so ask for it uncompressed
+    headers = {'Range': f'bytes={start}-{end - 1}',
+               'Accept-Encoding': 'identity'}
+    with requests.get(url=url, headers=headers, stream=True) as r:
+        r.raise_for_status()
+        if r.status_code != requests.codes.partial_content:
+            raise requests.HTTPError(
+                f'Range request is not supported by {url}', response=r)
+        position = start
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            # Never write or report past the end of the range
+            chunk = chunk[:end - position]
+            buffer[position:position + len(chunk)] = chunk
+            position += len(chunk)
+            update(len(chunk))
+            if position == end:
+                break
+
+        # Fail instead of leaving preallocated zeros in the file
+        if position != end:
+            raise requests.HTTPError(
+                f'Incomplete range {start}-{end - 1} received from {url} '
+                f'({position - start} of {end - start} bytes)', response=r)
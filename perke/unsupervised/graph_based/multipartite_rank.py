@@ -143,9 +143,12 @@ class MultipartiteRank(TopicRank):
             if self.topic_ids[node_i] == self.topic_ids[node_j]:
                 continue
 
+            # Get gap shifts according to candidate lengths once
             weights = []
             candidate_i = self.candidates[node_i]
             candidate_j = self.candidates[node_j]
+            shift_i = candidate_i.length - 1
+            shift_j = candidate_j.length - 1
             for p_i in candidate_i.offsets:
                 for p_j in candidate_j.offsets:
 
@@ -154,11 +157,13 @@ class MultipartiteRank(TopicRank):
 
                     # Alter gap according to candidate length
                     if p_i < p_j:
-                        gap -= len(candidate_i.normalized_words) - 1
+                        gap -= shift_i
                     if p_j < p_i:
-                        gap -= len(candidate_j.normalized_words) - 1
+                        gap -= shift_j
 
-                    weights.append(1.0/gap)
+                    # Skip coinciding occurrences
+                    if gap != 0:
+                        weights.append(1.0/gap)
 
             # Add weighted edges
             if weights:
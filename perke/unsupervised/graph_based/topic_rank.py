@@ -1,8 +1,8 @@
-from itertools import combinations
 from typing import List, Literal, Optional, Set, Tuple
 
 import networkx as nx
 import numpy as np
+from scipy import sparse
 from scipy.cluster.hierarchy import fcluster, linkage
 from scipy.spatial.distance import pdist
 
@@ -10,6 +10,7 @@ from perke.base.extractor import Extractor
 from perke.base.types import (HierarchicalClusteringLinkageMethod,
                               HierarchicalClusteringMetric,
                               TopicHeuristic)
+from perke.utils.functions import pagerank
 
 
 class TopicRank(Extractor):
@@ -73,6 +74,9 @@ class TopicRank(Extractor):
     graph: `nx.Graph`
         The topic graph
 
+    adjacency_matrix: `np.ndarray`
+        Weighted adjacency matrix of the topic graph
+
     topics: `list[list[str]]`
         List of topics
     """
@@ -89,6 +93,7 @@ class TopicRank(Extractor):
         """
         super().__init__(valid_pos_tags)
         self.graph = nx.Graph()
+        self.adjacency_matrix = None
         self.topics = []
 
     def select_candidates(self) -> None:
@@ -103,7 +108,7 @@ class TopicRank(Extractor):
         # Filter candidates containing stopwords or punctuation marks
         self.filter_candidates(stopwords=self.stopwords)
 
-    def vectorize_candidates(self) -> Tuple[List[str], np.ndarray]:
+    def vectorize_candidates(self) -> Tuple[List[str], sparse.csr_matrix]:
         """
         Vectorize the keyphrase candidates.
 
@@ -112,24 +117,29 @@ class TopicRank(Extractor):
         candidates: `list[str]`
             The list of candidates (canonical forms).
 
-        candidate_matrix: `np.ndarray`
-            Vectorized representation of the candidates.
+        candidate_matrix: `sparse.csr_matrix`
+            Sparse boolean vectorized representation of the candidates,
+            i.e. presence of each vocabulary word in each candidate.
         """
-        # Build the vocabulary, i.e. setting the vector dimensions
-        vocabulary = set()
-        for candidate in self.candidates.values():
-            for word in candidate.normalized_words:
-                vocabulary.add(word)
-        vocabulary = list(vocabulary)
-
-        # Vectorize the candidates and sort for random issues
-        candidates = list(self.candidates)
-        candidates.sort()
-
-        candidate_matrix = np.zeros((len(candidates), len(vocabulary)))
+        # Sort candidates for random issues
+        candidates = sorted(self.candidates)
+
+        # Build the vocabulary, i.e. setting the vector dimensions, while
+        # collecting the (candidate, word) indices
+        word_to_index = {}
+        rows = []
+        columns = []
         for i, c in enumerate(candidates):
             for word in self.candidates[c].normalized_words:
-                candidate_matrix[i, vocabulary.index(word)] += 1
+                rows.append(i)
+                columns.append(word_to_index.setdefault(word,
+                                                        len(word_to_index)))
+
+        # Vectorize the candidates
+        candidate_matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, columns)),
+            shape=(len(candidates), len(word_to_index)),
+        )
 
         return candidates, candidate_matrix
 
@@ -169,9 +179,25 @@ class TopicRank(Extractor):
         # Vectorize the candidates
         candidates, candidate_matrix = self.vectorize_candidates()
 
-        # Compute the distance matrix
-        distance_matrix = pdist(candidate_matrix, metric)
-        distance_matrix = np.nan_to_num(distance_matrix)
+        if metric == HierarchicalClusteringMetric.jaccard:
+            # Count shared normalized words of each pair of candidates
+            candidate_matrix = candidate_matrix.astype(float)
+            intersections = candidate_matrix @ candidate_matrix.T
+
+            # Handle content with no shared normalized words between
+            # candidates, each candidate forms its own topic
+            if (threshold < 1
+                    and intersections.count_nonzero() == len(candidates)
+                    and intersections.diagonal().all()):
+                self.topics.extend([c] for c in candidates)
+                return
+
+            # Compute the distance matrix
+            distance_matrix = _jaccard_distances(intersections.toarray())
+        else:
+            # Compute the distance matrix
+            distance_matrix = pdist(candidate_matrix.toarray(), metric)
+            distance_matrix = np.nan_to_num(distance_matrix)
 
         # Compute the clusters
         clusters = linkage(distance_matrix, method=linkage_method)
@@ -179,10 +205,12 @@ class TopicRank(Extractor):
         # Form flat clusters
         flat_clusters = fcluster(clusters, t=threshold, criterion='distance')
 
-        # For each topic identifier
-        for cluster_id in range(1, max(flat_clusters) + 1):
-            self.topics.append([candidates[j] for j in range(len(flat_clusters))
-                                if flat_clusters[j] == cluster_id])
+        # Group candidates by topic identifier in one pass, the stable
+        # sort keeps the order of candidates within each topic
+        order = np.argsort(flat_clusters, kind='stable')
+        boundaries = np.flatnonzero(np.diff(flat_clusters[order])) + 1
+        for group in np.split(order, boundaries):
+            self.topics.append([candidates[j] for j in group.tolist()])
 
     def build_topic_graph(self) -> None:
         """
@@ -191,22 +219,35 @@ class TopicRank(Extractor):
         # Adding the nodes to the graph
         self.graph.add_nodes_from(range(len(self.topics)))
 
-        # Loop through the topics to connect the nodes
-        for i, j in combinations(range(len(self.topics)), 2):
-            self.graph.add_edge(i, j, weight=0.0)
-            for c_i in self.topics[i]:
-                candidate_i = self.candidates[c_i]
-                for c_j in self.topics[j]:
-                    candidate_j = self.candidates[c_j]
-                    for p_i in candidate_i.offsets:
-                        for p_j in candidate_j.offsets:
-                            gap = abs(p_i - p_j)
-                            if p_i < p_j:
-                                gap -= len(candidate_i.normalized_words) - 1
-                            elif p_j < p_i:
-                                gap -= len(candidate_j.normalized_words) - 1
-
-                            self.graph[i][j]['weight'] += 1.0/gap
+        # Flatten the occurrences of the topics into arrays once
+        offsets = []
+        candidate_lengths = []
+        n_occurrences = []
+        topic_candidate_starts = [0]
+        for topic in self.topics:
+            for c in topic:
+                candidate = self.candidates[c]
+                offsets.append(candidate.offsets)
+                candidate_lengths.append(candidate.length)
+                n_occurrences.append(len(candidate.offsets))
+            topic_candidate_starts.append(len(n_occurrences))
+        offsets = np.concatenate(offsets).astype(np.int32, copy=False)
+        lengths = np.repeat(np.asarray(candidate_lengths, dtype=np.int32),
+                            n_occurrences)
+        topic_starts = np.concatenate(([0], np.cumsum(n_occurrences)))
+        topic_starts = topic_starts[topic_candidate_starts]
+
+        # Compute the edge weights
+        weights = _compute_edge_weights(offsets, lengths, topic_starts)
+
+        # Connect the nodes at once, missing edges have zero weight
+        rows, columns = np.nonzero(weights)
+        self.graph.add_weighted_edges_from(zip(rows.tolist(),
+                                               columns.tolist(),
+                                               weights[rows, columns].tolist()))
+
+        # Keep the symmetric adjacency matrix for the random walk
+        self.adjacency_matrix = weights + weights.T
 
     def weight_candidates(
         self,
@@ -249,32 +290,109 @@ class TopicRank(Extractor):
         # Build the topic graph
         self.build_topic_graph()
 
-        # Compute the word weights using random walk
-        weights = nx.pagerank(self.graph, alpha=0.85, weight='weight')
+        # Compute the word weights using random walk, the tolerance is
+        # kept at networkx's default since topic weights are close to
+        # each other and a looser tolerance reorders the best topics
+        weights = pagerank(self.adjacency_matrix, alpha=0.85, tol=1e-06)
+
+        # Get the first offset and the frequency of each candidate once
+        first_offsets = {c: candidate.offsets[0]
+                         for c, candidate in self.candidates.items()}
+        if topic_heuristic == TopicHeuristic.frequent:
+            frequencies = {c: len(candidate.all_words)
+                           for c, candidate in self.candidates.items()}
 
         # Loop through the topics
         for i, topic in enumerate(self.topics):
 
-            # Get the offsets of the topic candidates
-            offsets = [self.candidates[c].offsets[0] for c in topic]
-
             # Get first candidate from topic
             if topic_heuristic == TopicHeuristic.frequent:
 
-                # Get frequencies for each candidate within the topic
-                frequencies = [len(self.candidates[c].all_words)
-                               for c in topic]
+                # Get the first occurring of the most frequent candidates
+                most_frequent = min(
+                    topic, key=lambda c: (-frequencies[c], first_offsets[c]))
+                self.candidates[most_frequent].weight = weights[i]
 
-                # Get the indices of the most frequent candidates
-                max_frequency = max(frequencies)
-                indices = [j for j, f in enumerate(frequencies)
-                           if f == max_frequency]
+            else:
+                first = min(topic, key=first_offsets.__getitem__)
+                self.candidates[first].weight = weights[i]
 
-                # Offsets of the indexes
-                indices_offsets = [offsets[j] for j in indices]
-                most_frequent = indices_offsets.index(min(indices_offsets))
-                self.candidates[topic[most_frequent]].weight = weights[i]
 
-            else:
-                first = offsets.index(min(offsets))
-                self.candidates[topic[first]].weight = weights[i]
+def _jaccard_distances(intersections: np.ndarray) -> np.ndarray:
+    """
+    Computes condensed jaccard distance matrix, same as `pdist` with
+    `'jaccard'` metric, from the pairwise intersection sizes of boolean
+    vectors.
+
+    Parameters
+    ----------
+    intersections: `np.ndarray`
+        Square matrix of intersection sizes, the diagonal holds the
+        sizes of the vectors
+
+    Returns
+    -------
+    distance_matrix: `np.ndarray`
+        Condensed distance matrix
+    """
+    sizes = np.diagonal(intersections)
+    rows, columns = np.triu_indices(len(sizes), k=1)
+    intersections = intersections[rows, columns]
+    unions = sizes[rows] + sizes[columns] - intersections
+
+    # Distance of two empty vectors is zero
+    distance_matrix = np.zeros(len(unions))
+    np.divide(unions - intersections, unions,
+              out=distance_matrix, where=unions > 0)
+    return distance_matrix
+
+
+def _compute_edge_weights(offsets: np.ndarray,
+                          lengths: np.ndarray,
+                          topic_starts: np.ndarray,
+                          ) -> np.ndarray:
+    """
+    Computes the topic graph edge weights, i.e. sum of reciprocal gaps
+    between all occurrences of candidates of each pair of topics, zero
+    gaps are skipped.
+
+    Parameters
+    ----------
+    offsets: `np.ndarray`
+        Offsets of all occurrences, grouped by topic
+
+    lengths: `np.ndarray`
+        Number of normalized words of the candidate of each occurrence
+
+    topic_starts: `np.ndarray`
+        Index of the first occurrence of each topic in `offsets`, plus
+        the total number of occurrences at the end
+
+    Returns
+    -------
+    weights: `np.ndarray`
+        Upper triangular matrix of edge weights
+    """
+    n_topics = len(topic_starts) - 1
+    weights = np.zeros((n_topics, n_topics))
+    for i in range(n_topics - 1):
+        start, end = topic_starts[i], topic_starts[i + 1]
+
+        # Compute gaps from topic i occurrences to all later occurrences
+        difference = offsets[None, end:] - offsets[start:end, None]
+
+        # Alter gaps according to the length of the preceding candidate
+        gaps = np.abs(difference) - np.where(
+            difference > 0,
+            lengths[start:end, None] - 1,
+            np.where(difference < 0, lengths[None, end:] - 1, 0),
+        )
+
+        # Sum reciprocal gaps for each later topic, coinciding
+        # occurrences (zero gaps) are skipped
+        reciprocals = np.divide(1.0, gaps,
+                                out=np.zeros(gaps.shape), where=gaps != 0)
+        weights[i, i + 1:] = np.add.reduceat(reciprocals.sum(axis=0),
+                                             topic_starts[i + 1:-1] - end)
+
+    return weights
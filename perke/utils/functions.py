@@ -1,3 +1,10 @@
+from typing import List
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+
 def is_alphanumeric(word: str, valid_punctuation_marks: str = '-') -> bool:
     """
     Check if a word contains only alpha-numeric
@@ -19,3 +26,60 @@ def is_alphanumeric(word: str, valid_punctuation_marks: str = '-') -> bool:
     for punctuation_mark in valid_punctuation_marks.split():
         word = word.replace(punctuation_mark, '')
     return word.isalnum()
+
+
+def pagerank(adjacency_matrix: np.ndarray,
+             alpha: float = 0.85,
+             max_iter: int = 100,
+             tol: float = 1e-06,
+             ) -> List[float]:
+    """
+    Computes pagerank of the nodes of a weighted graph directly from its
+    adjacency matrix, same as `nx.pagerank` but without building and
+    converting a networkx graph.
+
+    Parameters
+    ----------
+    adjacency_matrix: `np.ndarray`
+        Square matrix of edge weights from row nodes to column nodes
+
+    alpha: `float`
+        Damping parameter, defaults to `0.85`.
+
+    max_iter: `int`
+        Maximum number of power iterations, defaults to `100`.
+
+    tol: `float`
+        Error tolerance used to check convergence, defaults to `1e-06`.
+
+    Returns
+    -------
+    weights: `list[float]`
+        Pagerank of each node
+
+    Raises
+    ------
+    nx.PowerIterationFailedConvergence
+        If the power iteration does not converge in `max_iter`
+        iterations.
+    """
+    n = adjacency_matrix.shape[0]
+    if n == 0:
+        return []
+
+    # Build the row stochastic transition matrix
+    matrix = sparse.csr_matrix(adjacency_matrix, dtype=float)
+    out_degrees = np.asarray(matrix.sum(axis=1)).flatten()
+    dangling = out_degrees == 0
+    out_degrees[~dangling] = 1.0/out_degrees[~dangling]
+    transposed = (sparse.diags(out_degrees) @ matrix).T.tocsr()
+
+    # Power iteration, dangling nodes link to all nodes uniformly
+    x = np.full(n, 1.0/n)
+    for _ in range(max_iter):
+        last_x = x
+        x = alpha*(transposed @ last_x + last_x[dangling].sum()/n)
+        x += (1 - alpha)/n
+        if np.abs(x - last_x).sum() < n*tol:
+            return x.tolist()
+    raise nx.PowerIterationFailedConvergence(max_iter)
@@ -1,7 +1,10 @@
 from os.path import dirname, join
+from typing import List, Tuple
 
 import pytest
 
+from perke.base.extractor import Extractor
+
 
 @pytest.fixture(scope='session')
 def text() -> str:
@@ -11,3 +14,13 @@ def text() -> str:
     with open(input_filepath) as f:
         text = f.read()
     return text
+
+
+def add_occurrences(extractor: Extractor,
+                    occurrences: List[Tuple[List[str], int]],
+                    ) -> None:
+    for words, offset in occurrences:
+        extractor.add_candidate_occurrence(words=words,
+                                           offset=offset,
+                                           pos_tags=['N']*len(words),
+                                           normalized_words=words)
@@ -0,0 +1,53 @@
+import mmap
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Iterator
+
+import pytest
+import requests
+
+from perke.cli.download import download_range
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == '/short':
+            # Promise a partial content, but close the connection early
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes 0-99/100')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'x'*40)
+        else:
+            # Ignore the range and send the whole file
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.end_headers()
+            self.wfile.write(b'x'*100)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_range_incomplete_response(server_url: str) -> None:
+    with mmap.mmap(-1, 100) as buffer:
+        with pytest.raises(requests.HTTPError, match='Incomplete range'):
+            download_range(f'{server_url}/short', 0, 100, buffer,
+                           lambda n: None)
+
+
+def test_download_range_unsupported(server_url: str) -> None:
+    with mmap.mmap(-1, 100) as buffer:
+        with pytest.raises(requests.HTTPError, match='not supported'):
+            download_range(f'{server_url}/full', 0, 100, buffer,
+                           lambda n: None)
@@ -0,0 +1,31 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from perke.utils.functions import pagerank
+
+
+def test_pagerank_weighted_graph() -> None:
+    adjacency_matrix = np.array([[0.0, 2.0, 0.5, 0.0],
+                                 [2.0, 0.0, 1.0, 0.0],
+                                 [0.5, 1.0, 0.0, 0.0],
+                                 [1.5, 0.0, 0.0, 0.0]])
+    graph = nx.from_numpy_array(adjacency_matrix, create_using=nx.DiGraph)
+    expected = nx.pagerank(graph, alpha=0.85, weight='weight')
+    weights = pagerank(adjacency_matrix, alpha=0.85)
+    assert all(isinstance(weight, float) for weight in weights)
+    assert weights == pytest.approx([expected[i] for i in range(4)])
+
+
+def test_pagerank_dangling_node() -> None:
+    adjacency_matrix = np.array([[0.0, 1.0, 3.0],
+                                 [1.0, 0.0, 0.0],
+                                 [0.0, 0.0, 0.0]])
+    graph = nx.from_numpy_array(adjacency_matrix, create_using=nx.DiGraph)
+    expected = nx.pagerank(graph, alpha=0.85, weight='weight')
+    weights = pagerank(adjacency_matrix, alpha=0.85)
+    assert weights == pytest.approx([expected[i] for i in range(3)])
+
+
+def test_pagerank_empty_graph() -> None:
+    assert pagerank(np.zeros((0, 0))) == []
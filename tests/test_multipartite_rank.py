@@ -1,4 +1,5 @@
 from perke.unsupervised.graph_based import MultipartiteRank
+from tests.conftest import add_occurrences
 
 
 def test_original_article_default(text: str) -> None:
@@ -11,3 +12,10 @@ def test_original_article_default(text: str) -> None:
     assert keyphrases == ['رایانه',
                           'طبیعی',
                           'پردازش زبان گفتاری']
+
+
+def test_coinciding_occurrences() -> None:
+    extractor = MultipartiteRank()
+    add_occurrences(extractor, [(['alpha'], 0), (['beta'], 0), (['beta'], 4)])
+    extractor.weight_candidates()
+    assert extractor.graph['alpha']['beta']['weight'] == 0.25
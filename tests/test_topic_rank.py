@@ -1,4 +1,11 @@
+from itertools import combinations
+
+import numpy as np
+
+from perke.base.types import TopicHeuristic
 from perke.unsupervised.graph_based import TopicRank
+from perke.unsupervised.graph_based.topic_rank import _compute_edge_weights
+from tests.conftest import add_occurrences
 
 
 def test_original_article_default(text: str) -> None:
@@ -11,3 +18,55 @@ def test_original_article_default(text: str) -> None:
     assert keyphrases == ['طبیعی',
                           'رایانه',
                           'پردازش زبان گفتاری']
+
+
+def test_frequent_heuristic() -> None:
+    extractor = TopicRank()
+    occurrences = [(['alpha'], 0),
+                   (['alpha', 'gamma'], 3),
+                   (['alpha', 'beta'], 10),
+                   (['alpha', 'beta'], 20),
+                   (['alpha', 'gamma'], 30),
+                   (['delta'], 40)]
+    add_occurrences(extractor, occurrences)
+    extractor.weight_candidates(topic_heuristic=TopicHeuristic.frequent)
+    assert extractor.topics[0] == ['alpha', 'alpha beta', 'alpha gamma']
+
+    # The first occurring of the most frequent candidates is selected
+    weighted = {c for c, candidate in extractor.candidates.items()
+                if candidate.weight > 0}
+    assert weighted == {'alpha gamma', 'delta'}
+
+
+def test_compute_edge_weights_with_zero_gaps() -> None:
+    # Topics as lists of (offsets, length) of their candidates, some
+    # occurrences of different topics coincide
+    topics = [[([0, 7], 2), ([12], 1)],
+              [([7], 1)],
+              [([3, 12], 3), ([20, 25], 1)],
+              [([0], 2)]]
+
+    # Scalar loop reference, skipping zero gaps
+    expected = np.zeros((len(topics), len(topics)))
+    for i, j in combinations(range(len(topics)), 2):
+        for offsets_i, length_i in topics[i]:
+            for offsets_j, length_j in topics[j]:
+                for p_i in offsets_i:
+                    for p_j in offsets_j:
+                        gap = abs(p_i - p_j)
+                        if p_i < p_j:
+                            gap -= length_i - 1
+                        elif p_j < p_i:
+                            gap -= length_j - 1
+                        if gap != 0:
+                            expected[i, j] += 1.0/gap
+
+    offsets = [p for topic in topics for c, _ in topic for p in c]
+    lengths = [length for topic in topics for c, length in topic for _ in c]
+    topic_starts = np.cumsum([0] + [sum(len(c) for c, _ in topic)
+                                    for topic in topics])
+    weights = _compute_edge_weights(np.asarray(offsets, dtype=np.int32),
+                                    np.asarray(lengths, dtype=np.int32),
+                                    topic_starts)
+    assert np.isfinite(weights).all()
+    assert np.allclose(weights, expected)